@@ -16,6 +16,8 @@ from dataclasses import dataclass
 from typing import List, Dict, Tuple, Optional
 import queue
 import math
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import colorama
 import json
 colorama.init()
@@ -46,6 +48,8 @@ TRACK_COLORS = CONFIG.get('track_colors', [
   ])
 # 音符名称
 NOTE_NAMES = CONFIG.get('note_names', ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B'])
+# 实时模式中除音符外也要录制的消息（踏板等控制器、弯音、音色切换、触后）
+LIVE_RECORD_TYPES = ('control_change', 'pitchwheel', 'program_change', 'aftertouch', 'polytouch')
 
 # 读取语言文件
 with open(CONFIG.get('language', 'lang/zh-CN.json'), 'r', encoding='utf-8') as f:
@@ -80,6 +84,21 @@ class NoteEvent:
     end_time: float = 0
 
 
+class LoopbackInput:
+    """本地回环输入端口，供测试或在代码中直接调用 play_live_loop 时代替 mido 输入端口，send() 的消息直接交给 callback"""
+    def __init__(self, name: str = 'loopback'):
+        self.name = name
+        self.callback = None
+        self.closed = False
+
+    def send(self, msg: mido.Message):
+        if self.callback and not self.closed:
+            self.callback(msg)
+
+    def close(self):
+        self.closed = True
+
+
 class MIDIPlayer:
     def __init__(self):
         self.midi_file: Optional[mido.MidiFile] = None
@@ -99,6 +118,12 @@ class MIDIPlayer:
         self.display_width: int = 0
         # 设置竖线高度为40
         self.display_height: int = CONFIG.get('display_height', 40)
+        # 实时模式：录制的事件日志 (时间, 消息)，以及正在上升的音符
+        self.live_log: List[Tuple[float, mido.Message]] = []
+        self.live_rolls: deque = deque()
+        self.live_chord: Tuple[str, List[str]] = ("", [])
+        self.live_chord_time: float = 0
+        self.live_range: Optional[Tuple[int, int]] = None
         # 设置最小音符宽度为6个8度
         min_note = 12 * 6 + 48  # C3起，6个8度
         # 统计乐曲实际包含的音符范围
@@ -172,6 +197,31 @@ class MIDIPlayer:
             except ValueError:
                 print(LANG.get("enter_number","请输入数字"))
 
+    def select_input_port(self) -> Optional[str]:
+        """选择实时模式的MIDI输入设备，返回设备名"""
+        ports = mido.get_input_names()
+        if not ports:
+            print(LANG.get('no_midi_input', "没有找到可用的MIDI输入设备"))
+            return None
+
+        print(LANG.get('available_input_ports', "可用的MIDI输入设备:"))
+        for i, port in enumerate(ports):
+            print(f"{i}: {port}")
+
+        while True:
+            try:
+                choice = input(LANG.get("select_port","请选择设备编号(默认0): "))
+                if not choice:
+                    choice = 0
+                else:
+                    choice = int(choice)
+
+                if 0 <= choice < len(ports):
+                    return ports[choice]
+                print(LANG.get("invalid_choice","无效的选择，请重试"))
+            except ValueError:
+                print(LANG.get("enter_number","请输入数字"))
+
     def load_midi_file(self, file_path: str):
         try:
             self.midi_file = mido.MidiFile(file_path)
@@ -372,13 +422,22 @@ class MIDIPlayer:
         """
         在乐谱下方显示和弦名、持续时间、构成音
         """
+        print(self._format_chord(chord_name, chord_notes, duration))
+
+    def _format_chord(self, chord_name, chord_notes, duration) -> str:
         if chord_name:
-            print(f"\033[43;1H\033[1m{LANG.get('label','和弦:')}\033[0m {chord_name}  \033[1m{LANG.get('duration','持续:')}\033[0m {duration:.2f}{LANG.get('seconds','s')}  \033[1m{LANG.get('components','构成:')}\033[0m {' '.join(chord_notes)}\033[K")
-        else:
-            print(f"\033[43;1H\033[1m{LANG.get('label','和弦:')}\033[0m {LANG.get('none','无')}\033[K")
+            return f"\033[43;1H\033[1m{LANG.get('label','和弦:')}\033[0m {chord_name}  \033[1m{LANG.get('duration','持续:')}\033[0m {duration:.2f}{LANG.get('seconds','s')}  \033[1m{LANG.get('components','构成:')}\033[0m {' '.join(chord_notes)}\033[K"
+        return f"\033[43;1H\033[1m{LANG.get('label','和弦:')}\033[0m {LANG.get('none','无')}\033[K"
 
-    def display_keyboard(self, block_queue=None):
+    def display_keyboard(self, block_queue=None, active_notes=None):
         print("\033[1;1H")  # 将光标移动到左上角
+        frame = self._format_keyboard(block_queue, active_notes)
+        self.clear_screen()
+        self.display_header()
+        print(frame)
+
+    def _format_keyboard(self, block_queue=None, active_notes=None) -> str:
+        """生成方块区域和底部键盘的整帧字符串"""
         screen_lines = [[' ' for _ in range(self.display_width)] for _ in range(self.display_height)]
         # 绘制静态的竖线
         for pos, name in self.keyboard_positions:
@@ -399,7 +458,9 @@ class MIDIPlayer:
         keyboard_line = [' ' for _ in range(self.display_width)]
         # 统计当前正在播放的音符及其轨道
         note_color_map = {}
-        for note, events in self.active_notes.items():
+        if active_notes is None:
+            active_notes = self.active_notes
+        for note, events in active_notes.items():
             if events:
                 track = events[-1].track
                 color = TRACK_COLORS[track % len(TRACK_COLORS)]
@@ -420,11 +481,7 @@ class MIDIPlayer:
                     keyboard_line[pos] = '#'
                 else:
                     keyboard_line[pos] = name[0]
-        self.clear_screen()
-        self.display_header()
-        for line in screen_lines:
-            print(''.join(line))
-        print(''.join(keyboard_line))
+        return '\n'.join([''.join(line) for line in screen_lines] + [''.join(keyboard_line)])
 
     def play_note(self, note: int, velocity: int, duration: float, track: int):
         if not self.output:
@@ -619,6 +676,170 @@ class MIDIPlayer:
                 self.output.send(mido.Message('note_off', note=note, velocity=0))
             self.output.close()
 
+    def play_live_loop(self, input_port=None, record_path: str = None):
+        """实时模式：从MIDI输入接收音符，方块从键盘向上滚动，和弦随事件检测，结束后可保存录制"""
+        self.midi_file = None
+        self.active_notes.clear()
+        self.live_log = []
+        self.live_rolls.clear()
+        self.live_chord = ("", [])
+        self.live_range = None
+        try:
+            asyncio.run(self._live_main(input_port))
+        except KeyboardInterrupt:
+            print(LANG.get("playback_stopped","播放停止"))
+        finally:
+            self.playing = False
+            if record_path and self.live_log:
+                self.save_live_recording(record_path)
+                print(f"{LANG.get('record_saved','录制已保存:')} {record_path}")
+
+    def stop_live(self):
+        """结束实时模式（可从其他线程调用）"""
+        self.playing = False
+
+    async def _live_main(self, input_port):
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def on_message(msg):
+            # 在 mido 的接收线程中调用：立即打时间戳，然后交给事件循环，不做其他处理
+            loop.call_soon_threadsafe(events.put_nowait, (time.time() - self.start_time, msg))
+
+        self.start_time = time.time()
+        self.playing = True
+        if input_port is None or isinstance(input_port, str):
+            virtual_name = CONFIG.get('live_virtual_port', '')
+            if input_port is None and virtual_name:
+                port = mido.open_input(virtual_name, virtual=True, callback=on_message)
+            else:
+                port = mido.open_input(input_port, callback=on_message)
+        else:
+            port = input_port
+            port.callback = on_message
+        # 渲染放在单独线程，终端输出阻塞时不影响事件接收
+        render_executor = ThreadPoolExecutor(max_workers=1)
+        render_task = asyncio.ensure_future(self._live_render(render_executor))
+        ingest_task = asyncio.ensure_future(self._live_ingest(events))
+        try:
+            # 任一协程结束都退出实时模式：渲染结束表示正常停止，接收结束说明出错，由 result() 抛出异常
+            done, _ = await asyncio.wait([render_task, ingest_task], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            self.playing = False
+            ingest_task.cancel()
+            await asyncio.gather(render_task, ingest_task, return_exceptions=True)
+            port.close()
+            # 让出一次事件循环，使已经通过 call_soon_threadsafe 提交的消息进入队列
+            await asyncio.sleep(0)
+            # 处理关闭前已到达的事件，并补齐仍按住音符的 note_off，保证录制完整
+            while not events.empty():
+                now, msg = events.get_nowait()
+                self._ingest_live_message(msg, now)
+            now = time.time() - self.start_time
+            for note, notes in list(self.active_notes.items()):
+                for ev in notes:
+                    self.live_log.append((now, mido.Message('note_off', note=note, velocity=0, channel=ev.track)))
+            self.active_notes.clear()
+            render_executor.shutdown(wait=True)
+
+    async def _live_ingest(self, events: asyncio.Queue):
+        while True:
+            now, msg = await events.get()
+            self._ingest_live_message(msg, now)
+
+    def _ingest_live_message(self, msg: mido.Message, now: float):
+        """把一条实时消息写入活动音符、录制日志，并增量更新和弦"""
+        if msg.type == 'note_on' and msg.velocity > 0:
+            event = NoteEvent(msg.note, msg.velocity, now, msg.channel, 0)
+            keys_changed = not self.active_notes.get(msg.note)
+            self.active_notes[msg.note].append(event)
+            self.live_rolls.append(event)
+            self.live_log.append((now, msg))
+            if not self.min_note <= msg.note <= self.max_note:
+                # 超出当前键盘范围，留给渲染协程在两帧之间扩展布局
+                low, high = self.live_range or (self.min_note, self.max_note)
+                self.live_range = (min(low, msg.note), max(high, msg.note))
+        elif (msg.type == 'note_off') or (msg.type == 'note_on' and msg.velocity == 0):
+            notes = self.active_notes.get(msg.note)
+            if not notes:
+                return
+            event = notes.pop(0)
+            event.end_time = now
+            event.duration = now - event.start_time
+            keys_changed = not notes
+            if keys_changed:
+                del self.active_notes[msg.note]
+            self.live_log.append((now, msg))
+        elif msg.type in LIVE_RECORD_TYPES:
+            # 不影响显示，只录制
+            self.live_log.append((now, msg))
+            return
+        else:
+            return
+        # 和弦只在按下的键集合变化时检测，不再每帧轮询
+        if not keys_changed:
+            return
+        chord_name, chord_notes, _ = self.detect_chord(list(self.active_notes))
+        if chord_name != self.live_chord[0]:
+            self.live_chord = (chord_name, chord_notes)
+            self.live_chord_time = now
+
+    async def _live_render(self, render_executor: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+        frame_time = 1 / max(1, CONFIG.get('live_fps', 60))
+        # 每秒上升的行数
+        speed = (self.display_height - 1) / max(0.1, CONFIG.get('live_scroll_time', 3.0))
+        bottom = self.display_height - 1
+        while self.playing:
+            frame_start = loop.time()
+            if self.live_range:
+                self.min_note, self.max_note = self.live_range
+                self.live_range = None
+                self._init_keyboard_layout()
+            now = time.time() - self.start_time
+            # 方块从键盘位置向上滚动，按住的音符从底部一直延伸到按下时的位置
+            # 只保留仍按住或仍在屏幕内的音符，长音按住时后面已滚出屏幕的音符也会被移除
+            block_queue = []
+            visible_rolls = deque()
+            for event in self.live_rolls:
+                top_line = bottom - int((now - event.start_time) * speed)
+                low_line = bottom - int((now - event.end_time) * speed) if event.end_time else bottom
+                if low_line < 0:
+                    continue
+                visible_rolls.append(event)
+                for line in range(max(top_line, 0), low_line + 1):
+                    block_queue.append({'note': event.note, 'track': event.track, 'steps': line})
+            self.live_rolls = visible_rolls
+            active_notes = {note: list(notes) for note, notes in self.active_notes.items() if notes}
+            chord_name, chord_notes = self.live_chord
+            duration = now - self.live_chord_time if chord_name else 0
+            await loop.run_in_executor(render_executor, self._render_live_frame,
+                                       block_queue, active_notes, chord_name, chord_notes, duration)
+            await asyncio.sleep(max(0, frame_time - (loop.time() - frame_start)))
+
+    def _render_live_frame(self, block_queue, active_notes, chord_name, chord_notes, duration):
+        # 整帧一次写出并立即刷新，避免帧尾（键盘行、和弦行）滞留在缓冲区里
+        frame = (COLOR_CLEAR + self._format_keyboard(block_queue, active_notes) + '\n'
+                 + self._format_chord(chord_name, chord_notes, duration) + '\n')
+        sys.stdout.write(frame)
+        sys.stdout.flush()
+
+    def save_live_recording(self, path: str):
+        """把实时模式录制的事件日志保存为单音轨MIDI文件"""
+        mid = mido.MidiFile(ticks_per_beat=self.ticks_per_beat)
+        track = mido.MidiTrack()
+        mid.tracks.append(track)
+        track.append(mido.MetaMessage('set_tempo', tempo=self.tempo, time=0))
+        first_time = self.live_log[0][0] if self.live_log else 0
+        last_tick = 0
+        for etime, msg in sorted(self.live_log, key=lambda e: e[0]):
+            tick = int(round(mido.second2tick(etime - first_time, self.ticks_per_beat, self.tempo)))
+            track.append(msg.copy(time=tick - last_tick))
+            last_tick = tick
+        mid.save(path)
+
     def run(self):
         self.clear_screen()
 
@@ -642,9 +863,17 @@ class MIDIPlayer:
 if __name__ == "__main__":
     player = MIDIPlayer()
     print("\033[2J\033[H")
+    print(LANG.get("live_hint","直接回车进入实时输入模式"))
     file_path = input(LANG.get("enter_midi_path","请输入MIDI文件路径:")).strip()
     ports = mido.get_output_names()
-    if not ports:
+    if not file_path:
+        # 配置了虚拟输入端口时直接使用，不再列出硬件设备
+        input_port = None if CONFIG.get('live_virtual_port', '') else player.select_input_port()
+        if input_port or CONFIG.get('live_virtual_port', ''):
+            record_path = input(LANG.get("enter_record_path","录制保存路径(留空不录制):")).strip()
+            print("\033[?25l\033[2J\033[H")  # 隐藏光标并清屏
+            player.play_live_loop(input_port, record_path or None)
+    elif not ports:
         print(LANG.get("no_midi_output","没有找到可用的MIDI输出设备"))
     else:
         print(LANG.get("select_port","请选择设备编号(默认0):"))
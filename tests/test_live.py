@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+import mido
+
+# main.py 按当前目录读取语言文件
+os.chdir(os.path.join(os.path.dirname(__file__), '..'))
+import main  # noqa: E402
+
+
+def wait_until(condition, thread, timeout=5):
+    """轮询直到条件成立；实时模式线程提前退出或超时都算失败"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert thread.is_alive(), "play_live_loop exited early"
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def start_live(player, port, path):
+    thread = threading.Thread(target=player.play_live_loop, args=(port, path))
+    thread.start()
+    wait_until(lambda: port.callback is not None, thread)
+    return thread
+
+
+def stop_live(player, thread):
+    player.stop_live()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_live_loop_with_loopback_input(tmp_path):
+    player = main.MIDIPlayer()
+    port = main.LoopbackInput()
+    path = str(tmp_path / 'live.mid')
+    thread = start_live(player, port, path)
+    try:
+        port.send(mido.Message('control_change', control=64, value=127))
+        for note in (60, 64, 67):
+            port.send(mido.Message('note_on', note=note, velocity=90))
+        wait_until(lambda: player.live_chord[0] == 'C', thread)
+        port.send(mido.Message('note_off', note=60, velocity=0))
+    finally:
+        stop_live(player, thread)
+
+    saved = [msg for msg in mido.MidiFile(path).tracks[0] if not msg.is_meta]
+    assert saved[0].type == 'control_change' and saved[0].control == 64
+    assert sorted(msg.note for msg in saved if msg.type == 'note_on') == [60, 64, 67]
+    # 结束时仍按住的音符也要补齐 note_off
+    assert sorted(msg.note for msg in saved if msg.type == 'note_off') == [60, 64, 67]
+
+
+def test_live_rolls_drop_released_notes_behind_held_note(tmp_path):
+    player = main.MIDIPlayer()
+    port = main.LoopbackInput()
+    thread = start_live(player, port, str(tmp_path / 'live.mid'))
+    try:
+        port.send(mido.Message('note_on', note=48, velocity=90))
+        for note in range(60, 72):
+            port.send(mido.Message('note_on', note=note, velocity=90))
+            port.send(mido.Message('note_off', note=note, velocity=0))
+        wait_until(lambda: len(player.live_rolls) == 13, thread)
+
+        # 把时间拨快，使已松开的音符滚出屏幕；按住的低音不能阻止它们被移除
+        player.start_time -= 2 * main.CONFIG.get('live_scroll_time', 3.0)
+        wait_until(lambda: [event.note for event in player.live_rolls] == [48], thread)
+    finally:
+        stop_live(player, thread)